@@ -9,7 +9,16 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 import os
-import json
+import sys
+import orjson
+import glob
+import bisect
+
+# Make the project root importable when run via `streamlit run app/dashboard.py`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.collector import KarachiAQICollector, AQI_BREAKPOINTS, AQI_CATEGORIES
+from src.models.trainer import SimpleAQIModel, create_sample_data, FEATURE_COLUMNS, TARGET_COLUMN
 
 # Page configuration
 st.set_page_config(
@@ -22,14 +31,39 @@ st.set_page_config(
 st.title("🌫️ Karachi Air Quality Index Predictor")
 st.markdown("### Real-time monitoring with 3-day forecasts")
 
+CURRENT_DATA_FILE = "data/processed/current_aqi.json"
+RAW_COLUMNS = ['timestamp', 'pm2_5', 'pm10', 'aqi']
+MAX_PLOT_POINTS = 1000
+AQI_COLORS = ("#10B981", "#F59E0B", "#F97316", "#EF4444", "#8B5CF6", "#7F1D1D")
+
+def file_cache_key(file_path):
+    """Modification time of a file, used to invalidate cached loaders"""
+    if file_path and os.path.exists(file_path):
+        return os.path.getmtime(file_path)
+    return None
+
+def latest_raw_file():
+    """Path of the most recently created raw data file (Parquet preferred over legacy CSV)"""
+    for pattern in ("data/raw/*.parquet", "data/raw/*.csv"):
+        files = glob.glob(pattern)
+        if files:
+            return max(files, key=os.path.getctime)
+    return None
+
+# Shared collector (one instance per server process, never mutated per user)
+@st.cache_resource
+def get_collector():
+    """AQI collector shared across reruns and sessions"""
+    return KarachiAQICollector()
+
 # Load current data
-def load_current_data():
-    """Load current AQI data"""
-    file_path = "data/processed/current_aqi.json"
+@st.cache_data(ttl=60)
+def load_current_data(file_path=CURRENT_DATA_FILE, cache_key=None):
+    """Load current AQI data (cached until the file changes)"""
     if os.path.exists(file_path):
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
         except:
             pass
     return {
@@ -40,17 +74,15 @@ def load_current_data():
     }
 
 # Load historical data
-def load_historical_data():
-    """Load historical AQI data"""
-    import glob
-    csv_files = glob.glob("data/raw/*.csv")
-    
-    if csv_files:
+@st.cache_data(ttl=300, max_entries=4)
+def load_historical_data(latest_file=None, cache_key=None):
+    """Load historical AQI data (cached until the file changes)"""
+    if latest_file:
         try:
-            # Get the latest file
-            latest_file = max(csv_files, key=os.path.getctime)
-            df = pd.read_csv(latest_file)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            if latest_file.endswith(".parquet"):
+                df = pd.read_parquet(latest_file, columns=RAW_COLUMNS)
+            else:
+                df = pd.read_csv(latest_file, usecols=RAW_COLUMNS, parse_dates=['timestamp'])
             return df
         except:
             pass
@@ -64,11 +96,134 @@ def load_historical_data():
         'aqi': np.random.uniform(100, 180, len(dates))
     })
 
+def lttb_indices(x, y, n_out):
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        # Keep the point forming the largest triangle with the previous pick and next bucket's mean
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    
+    return indices
+
+def downsample_trend(trend, n_out=MAX_PLOT_POINTS):
+    """Downsample a date/aqi trend to at most n_out points"""
+    x = pd.to_datetime(trend['date']).astype('int64').to_numpy(dtype=np.float64)
+    y = trend['aqi'].to_numpy(dtype=np.float64)
+    return trend.iloc[lttb_indices(x, y, n_out)].reset_index(drop=True)
+
+@st.cache_data(ttl=300, max_entries=4)
+def daily_avg_aqi(latest_file=None, cache_key=None):
+    """Downsampled daily average AQI of the historical data (cached until the file changes)"""
+    df = load_historical_data(latest_file, cache_key)
+    daily = df.groupby(df['timestamp'].dt.date.rename('date'))['aqi'].mean().reset_index()
+    return downsample_trend(daily)
+
+@st.fragment
+def render_forecast(current_aqi):
+    """3-day forecast cards"""
+    st.markdown("---")
+    st.markdown("## 📅 3-Day Forecast")
+    
+    # Generate forecast (simulated for now)
+    forecast_dates = [datetime.now() + timedelta(days=i) for i in range(1, 4)]
+    forecast_data = pd.DataFrame({
+        'Date': forecast_dates,
+        'Day': [d.strftime('%A') for d in forecast_dates],
+        'Predicted AQI': [current_aqi * 0.95, current_aqi * 0.92, current_aqi * 0.90],
+        'Category': ['Unhealthy for Sensitive', 'Unhealthy for Sensitive', 'Unhealthy for Sensitive']
+    })
+    
+    forecast_data['Predicted AQI'] = forecast_data['Predicted AQI'].round(1)
+    
+    # Display forecast
+    forecast_cols = st.columns(3)
+    for idx, row in forecast_data.iterrows():
+        with forecast_cols[idx]:
+            st.metric(
+                label=f"{row['Day']}",
+                value=f"{row['Predicted AQI']:.0f}",
+                delta=row['Category']
+            )
+
+@st.fragment
+def render_recommendations(category):
+    """Health recommendations for the current AQI category"""
+    st.markdown("---")
+    st.markdown("## 🏥 Health Recommendations")
+    
+    recommendations = {
+        "Good": "✅ Perfect for outdoor activities.",
+        "Moderate": "⚠️ Unusually sensitive people should consider reducing prolonged outdoor exertion.",
+        "Unhealthy for Sensitive": "⚠️ People with respiratory or heart disease, children and older adults should limit prolonged outdoor exertion.",
+        "Unhealthy": "❌ Everyone should reduce prolonged or heavy outdoor exertion.",
+        "Very Unhealthy": "❌ Everyone should avoid prolonged outdoor exertion.",
+        "Hazardous": "🚨 Everyone should avoid all outdoor activities."
+    }
+    
+    st.info(recommendations.get(category, "Check local health advisories."))
+
+@st.fragment
+def render_pipeline():
+    """Data collection and training controls"""
+    st.markdown("---")
+    st.markdown("## 🔄 Data Pipeline")
+    
+    if 'pipeline_message' in st.session_state:
+        st.success(st.session_state.pop('pipeline_message'))
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("🔄 Collect New Data", type="primary"):
+            with st.spinner("Data collection started..."):
+                collector = get_collector()
+                current = collector.get_current_aqi()
+                historical = collector.get_historical_data(days=3)
+                if current:
+                    collector.save_current_aqi(current)
+            
+            if historical.empty:
+                st.error("Data collection failed!")
+            else:
+                # New data files invalidate the cached loaders; rerun the full app to redraw
+                st.session_state['pipeline_message'] = f"Data collection complete! {len(historical)} records saved."
+                st.rerun()
+    
+    with col2:
+        if st.button("📊 Train Model"):
+            with st.spinner("Model training started..."):
+                data = create_sample_data()
+                model = SimpleAQIModel()
+                mae, rmse, r2 = model.train(data[FEATURE_COLUMNS], data[TARGET_COLUMN])
+                model.save()
+            
+            st.success(f"Model training complete! MAE: {mae:.2f}, R²: {r2:.3f}")
+
 # Main dashboard
 def main():
     # Load data
-    current_data = load_current_data()
-    historical_data = load_historical_data()
+    current_data = load_current_data(CURRENT_DATA_FILE, file_cache_key(CURRENT_DATA_FILE))
+    latest_file = latest_raw_file()
+    historical_data = load_historical_data(latest_file, file_cache_key(latest_file))
     
     # Current Status
     st.markdown("---")
@@ -79,16 +234,8 @@ def main():
     current_aqi = current_data.get('us_aqi', 145)
     
     # Determine AQI category
-    if current_aqi <= 50:
-        category, color = "Good", "#10B981"
-    elif current_aqi <= 100:
-        category, color = "Moderate", "#F59E0B"
-    elif current_aqi <= 150:
-        category, color = "Unhealthy for Sensitive", "#F97316"
-    elif current_aqi <= 200:
-        category, color = "Unhealthy", "#EF4444"
-    else:
-        category, color = "Very Unhealthy", "#8B5CF6"
+    level = bisect.bisect_left(AQI_BREAKPOINTS, current_aqi)
+    category, color = AQI_CATEGORIES[level], AQI_COLORS[level]
     
     with col1:
         st.metric("Current AQI", f"{current_aqi:.0f}", category)
@@ -105,30 +252,7 @@ def main():
     with col4:
         st.metric("Last Updated", datetime.now().strftime("%H:%M"))
     
-    # 3-Day Forecast
-    st.markdown("---")
-    st.markdown("## 📅 3-Day Forecast")
-    
-    # Generate forecast (simulated for now)
-    forecast_dates = [datetime.now() + timedelta(days=i) for i in range(1, 4)]
-    forecast_data = pd.DataFrame({
-        'Date': forecast_dates,
-        'Day': [d.strftime('%A') for d in forecast_dates],
-        'Predicted AQI': [current_aqi * 0.95, current_aqi * 0.92, current_aqi * 0.90],
-        'Category': ['Unhealthy for Sensitive', 'Unhealthy for Sensitive', 'Unhealthy for Sensitive']
-    })
-    
-    forecast_data['Predicted AQI'] = forecast_data['Predicted AQI'].round(1)
-    
-    # Display forecast
-    forecast_cols = st.columns(3)
-    for idx, row in forecast_data.iterrows():
-        with forecast_cols[idx]:
-            st.metric(
-                label=f"{row['Day']}",
-                value=f"{row['Predicted AQI']:.0f}",
-                delta=row['Category']
-            )
+    render_forecast(current_aqi)
     
     # Historical Chart
     st.markdown("---")
@@ -136,12 +260,11 @@ def main():
     
     if not historical_data.empty:
         # Create daily aggregates
-        historical_data['date'] = pd.to_datetime(historical_data['timestamp']).dt.date
-        daily_avg = historical_data.groupby('date')['aqi'].mean().reset_index()
+        daily_avg = daily_avg_aqi(latest_file, file_cache_key(latest_file))
         
         fig = go.Figure()
         
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=daily_avg['date'],
             y=daily_avg['aqi'],
             mode='lines+markers',
@@ -156,43 +279,15 @@ def main():
             xaxis_title="Date",
             yaxis_title="AQI",
             height=400,
-            plot_bgcolor='white'
+            plot_bgcolor='white',
+            uirevision='aqi'
         )
         
         st.plotly_chart(fig, use_container_width=True)
     
-    # Health Recommendations
-    st.markdown("---")
-    st.markdown("## 🏥 Health Recommendations")
+    render_recommendations(category)
     
-    recommendations = {
-        "Good": "✅ Perfect for outdoor activities.",
-        "Moderate": "⚠️ Unusually sensitive people should consider reducing prolonged outdoor exertion.",
-        "Unhealthy for Sensitive": "⚠️ People with respiratory or heart disease, children and older adults should limit prolonged outdoor exertion.",
-        "Unhealthy": "❌ Everyone should reduce prolonged or heavy outdoor exertion.",
-        "Very Unhealthy": "❌ Everyone should avoid prolonged outdoor exertion.",
-        "Hazardous": "🚨 Everyone should avoid all outdoor activities."
-    }
-    
-    st.info(recommendations.get(category, "Check local health advisories."))
-    
-    # Data Collection Status
-    st.markdown("---")
-    st.markdown("## 🔄 Data Pipeline")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        if st.button("🔄 Collect New Data", type="primary"):
-            st.info("Data collection started...")
-            # This would call your collector in a real app
-            st.success("Data collection complete!")
-    
-    with col2:
-        if st.button("📊 Train Model"):
-            st.info("Model training started...")
-            # This would call your trainer in a real app
-            st.success("Model training complete!")
+    render_pipeline()
 
 if __name__ == "__main__":
     main()
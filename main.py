@@ -3,6 +3,7 @@ Main orchestrator for AQI Prediction System
 """
 import sys
 import os
+import subprocess
 
 # Add src to path
 sys.path.append('src')
@@ -20,16 +21,22 @@ def main():
     
     if choice == "1":
         print("\nRunning data collection...")
-        os.system("python src/data/collector.py")
+        from src.data.collector import main as collect_main
+        collect_main()
     
     elif choice == "2":
         print("\nLaunching dashboard...")
         print("Open your browser at: http://localhost:8501")
-        os.system("streamlit run app/dashboard.py --server.port 8501 --server.address 0.0.0.0")
+        subprocess.Popen(
+            ["streamlit", "run", "app/dashboard.py", "--server.port", "8501", "--server.address", "0.0.0.0"],
+            env=os.environ.copy(),
+            start_new_session=True
+        )
     
     elif choice == "3":
         print("\nTraining model...")
-        os.system("python src/models/trainer.py")
+        from src.models.trainer import main as train_main
+        train_main()
     
     elif choice == "4":
         print("\nGoodbye! 👋")
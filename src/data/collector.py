@@ -2,18 +2,66 @@
 Complete AQI Data Collector for Karachi
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
+from numba import njit
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import os
-import json
+import bisect
+import orjson
+
+# Upper AQI bound (inclusive) of each category; anything above the last is Hazardous
+AQI_BREAKPOINTS = (50, 100, 150, 200, 300)
+AQI_CATEGORIES = ("Good", "Moderate", "Unhealthy for Sensitive", "Unhealthy", "Very Unhealthy", "Hazardous")
+
+# PM2.5 breakpoints (µg/m³) for the US EPA AQI segments
+_PM25_UPPER = np.array([12.0, 35.4, 55.4, 150.4, 250.4])
+_PM25_LOWER = np.array([0.0, 12.1, 35.5, 55.5, 150.5, 250.5])
+_AQI_BASE = np.array([0, 50, 100, 150, 200, 300], dtype=np.float64)
+_AQI_SLOPE = np.array([50/12.0, 50/23.3, 50/19.9, 50/94.9, 100/99.9, 200/249.9])
+
+@njit(cache=True)
+def _aqi_kernel(pm, upper, lower, base, slope, out):
+    """Per-element AQI over the breakpoint tables, compiled with numba, writes into out"""
+    last = upper.shape[0]
+    for i in range(pm.shape[0]):
+        value = pm[i]
+        if np.isnan(value):
+            out[i] = np.nan
+            continue
+        
+        # First segment whose upper bound covers the value, else the open-ended last one
+        seg = last
+        for j in range(last):
+            if value <= upper[j]:
+                seg = j
+                break
+        out[i] = base[seg] + (value - lower[seg]) * slope[seg]
 
 class KarachiAQICollector:
+    _AQI_BINS = [-np.inf, *AQI_BREAKPOINTS, np.inf]
+    _AQI_LABELS = list(AQI_CATEGORIES)
+    
     def __init__(self):
         self.lat = 24.8607
         self.lon = 67.0011
         self.city = "Karachi"
         self.base_url = "https://air-quality-api.open-meteo.com/v1/air-quality"
+        self.chunk_days = 30
+        self.max_workers = 4
+        
+        # Reuse HTTPS connections across requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=4,
+            max_retries=Retry(total=3, backoff_factor=0.3)
+        )
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip"
     
     def get_current_aqi(self):
         """Get current AQI data"""
@@ -27,7 +75,7 @@ class KarachiAQICollector:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = self.session.get(self.base_url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 current = data.get("current", {})
@@ -51,26 +99,18 @@ class KarachiAQICollector:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        params = {
-            "latitude": self.lat,
-            "longitude": self.lon,
-            "hourly": ["pm2_5", "pm10", "ozone"],
-            "start_date": start_date.strftime("%Y-%m-%d"),
-            "end_date": end_date.strftime("%Y-%m-%d"),
-            "timezone": "Asia/Karachi"
-        }
-        
         try:
-            response = requests.get(self.base_url, params=params, timeout=30)
+            # Fetch the range in chunks concurrently over the shared session
+            chunks = self._date_chunks(start_date, end_date)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                frames = list(executor.map(self._fetch_range, chunks))
             
-            if response.status_code == 200:
-                data = response.json()
+            if frames:
+                df = pd.concat(frames, ignore_index=True).rename(columns={"time": "timestamp"})
                 
-                # Create DataFrame
-                df = pd.DataFrame(data["hourly"])
-                if "time" in df.columns:
-                    df["timestamp"] = pd.to_datetime(df["time"])
-                    df = df.drop(columns=["time"])
+                # Open-Meteo returns ISO times like 2026-01-07T13:00
+                if "timestamp" in df.columns:
+                    df["timestamp"] = pd.to_datetime(df["timestamp"], format="%Y-%m-%dT%H:%M", cache=True)
                 
                 # Add location
                 df["city"] = self.city
@@ -79,12 +119,12 @@ class KarachiAQICollector:
                 
                 # Calculate AQI
                 df["aqi"] = self.calculate_aqi(df["pm2_5"])
-                df["aqi_category"] = df["aqi"].apply(self.get_aqi_category)
+                df["aqi_category"] = self.categorize_aqi(df["aqi"])
                 
                 # Save data
                 os.makedirs("data/raw", exist_ok=True)
-                filename = f"data/raw/karachi_aqi_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-                df.to_csv(filename, index=False)
+                filename = f"data/raw/karachi_aqi_{datetime.now().strftime('%Y%m%d_%H%M')}.parquet"
+                df.to_parquet(filename, compression="zstd", index=False)
                 
                 print(f"✅ Collected {len(df)} records")
                 print(f"💾 Saved to: {filename}")
@@ -96,44 +136,65 @@ class KarachiAQICollector:
         
         return pd.DataFrame()
     
+    def _date_chunks(self, start_date, end_date):
+        """Split a date range into consecutive (start, end) chunks of chunk_days"""
+        chunks = []
+        chunk_start = start_date
+        while chunk_start.date() <= end_date.date():
+            chunk_end = min(chunk_start + timedelta(days=self.chunk_days - 1), end_date)
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+        return chunks
+    
+    def _fetch_range(self, chunk):
+        """Fetch hourly data for a single (start, end) chunk"""
+        start_date, end_date = chunk
+        params = {
+            "latitude": self.lat,
+            "longitude": self.lon,
+            "hourly": ["pm2_5", "pm10", "ozone"],
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+            "timezone": "Asia/Karachi"
+        }
+        
+        response = self.session.get(self.base_url, params=params, timeout=30)
+        response.raise_for_status()
+        return pd.DataFrame(response.json()["hourly"])
+    
+    def save_current_aqi(self, current, filename="data/processed/current_aqi.json"):
+        """Save current AQI data"""
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(current, option=orjson.OPT_INDENT_2))
+        print(f"\n💾 Current data saved to: {filename}")
+    
     def calculate_aqi(self, pm25):
         """Calculate AQI from PM2.5"""
-        aqi = np.zeros(len(pm25))
+        values = np.asarray(pm25, dtype=np.float64)
+        
+        # Single readings skip the array machinery and use the compiled kernel
+        if values.ndim == 0:
+            out = np.empty(1)
+            _aqi_kernel(values.reshape(1), _PM25_UPPER, _PM25_LOWER, _AQI_BASE, _AQI_SLOPE, out)
+            return out[0]
         
-        for i, value in enumerate(pm25):
-            if pd.isna(value):
-                aqi[i] = np.nan
-            elif value <= 12.0:
-                aqi[i] = value * (50/12.0)
-            elif value <= 35.4:
-                aqi[i] = 50 + (value - 12.1) * (50/23.3)
-            elif value <= 55.4:
-                aqi[i] = 100 + (value - 35.5) * (50/19.9)
-            elif value <= 150.4:
-                aqi[i] = 150 + (value - 55.5) * (50/94.9)
-            elif value <= 250.4:
-                aqi[i] = 200 + (value - 150.5) * (100/99.9)
-            else:
-                aqi[i] = 300 + (value - 250.5) * (200/249.9)
+        # Segment index for each value, then linear interpolation within it
+        idx = np.searchsorted(_PM25_UPPER, values, side='left')
+        aqi = _AQI_BASE[idx] + (values - _PM25_LOWER[idx]) * _AQI_SLOPE[idx]
         
-        return aqi
+        return np.where(np.isnan(values), np.nan, aqi)
+    
+    def categorize_aqi(self, aqi):
+        """Get AQI categories for a Series of AQI values"""
+        categories = pd.cut(aqi, bins=self._AQI_BINS, labels=self._AQI_LABELS)
+        return categories.cat.add_categories("Unknown").fillna("Unknown")
     
     def get_aqi_category(self, aqi):
-        """Get AQI category"""
+        """Get AQI category for a single value"""
         if pd.isna(aqi):
             return "Unknown"
-        elif aqi <= 50:
-            return "Good"
-        elif aqi <= 100:
-            return "Moderate"
-        elif aqi <= 150:
-            return "Unhealthy for Sensitive"
-        elif aqi <= 200:
-            return "Unhealthy"
-        elif aqi <= 300:
-            return "Very Unhealthy"
-        else:
-            return "Hazardous"
+        return AQI_CATEGORIES[bisect.bisect_left(AQI_BREAKPOINTS, aqi)]
 
 def main():
     """Main function"""
@@ -158,10 +219,7 @@ def main():
         
         # Save current data
         if current:
-            os.makedirs("data/processed", exist_ok=True)
-            with open("data/processed/current_aqi.json", "w") as f:
-                json.dump(current, f, indent=2)
-            print(f"\n💾 Current data saved to: data/processed/current_aqi.json")
+            collector.save_current_aqi(current)
     
     print("\n" + "=" * 50)
     print("✅ Collection Complete!")
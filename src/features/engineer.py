@@ -10,29 +10,33 @@ class AQIFeatureEngineer:
         """Create features from raw data"""
         features = df.copy()
         
-        # Time features
-        features['hour'] = features['timestamp'].dt.hour
-        features['day_of_week'] = features['timestamp'].dt.dayofweek
-        features['month'] = features['timestamp'].dt.month
-        features['is_weekend'] = features['day_of_week'].isin([5, 6]).astype(int)
+        # Time features (parse only if the caller hasn't already)
+        if not pd.api.types.is_datetime64_any_dtype(features['timestamp']):
+            features['timestamp'] = pd.to_datetime(features['timestamp'])
+        dt = features['timestamp'].dt
+        features['hour'] = dt.hour.astype(np.int8)
+        features['day_of_week'] = dt.dayofweek.astype(np.int8)
+        features['month'] = dt.month.astype(np.int8)
+        features['is_weekend'] = (features['day_of_week'] >= 5).astype(np.int8)
+        
+        if 'aqi_category' in features.columns:
+            features['aqi_category'] = features['aqi_category'].astype('category')
         
         # Lag features
         features['pm2_5_lag_1h'] = features['pm2_5'].shift(1)
         features['pm2_5_lag_24h'] = features['pm2_5'].shift(24)
         
         # Rolling averages
-        features['pm2_5_6h_avg'] = features['pm2_5'].rolling(6).mean()
-        features['pm2_5_24h_avg'] = features['pm2_5'].rolling(24).mean()
+        features['pm2_5_6h_avg'] = features['pm2_5'].rolling(6, min_periods=1).mean()
+        features['pm2_5_24h_avg'] = features['pm2_5'].rolling(24, min_periods=1).mean()
         
         # Daily aggregates
-        features['date'] = features['timestamp'].dt.date
+        features['date'] = dt.date
         daily_avg = features.groupby('date')['aqi'].transform('mean')
         features['daily_avg_aqi'] = daily_avg
         
-        # Target: next day's average AQI
-        features['next_day_avg_aqi'] = features.groupby('date')['aqi'].transform(
-            lambda x: x.shift(-24).mean()
-        )
+        # Target: next day's average AQI (data is hourly, so 24 rows ahead)
+        features['next_day_avg_aqi'] = daily_avg.shift(-24)
         
         return features
     
@@ -3,25 +3,32 @@ Simple Model Training for AQI Prediction
 """
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 import os
 
+FEATURE_COLUMNS = ['daily_avg_aqi', 'pm2_5_mean', 'pm10_mean', 'day_of_week', 'prev_day_aqi']
+TARGET_COLUMN = 'next_day_aqi'
+
 class SimpleAQIModel:
     def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+        self.model = HistGradientBoostingRegressor(
+            max_iter=200, learning_rate=0.05, max_bins=255, random_state=42
+        )
         self.feature_importance = None
     
     def train(self, X, y):
         """Train the model"""
         print(f"🤖 Training model with {len(X)} samples...")
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, shuffle=False
-        )
+        # Trees bin features internally, float32 is plenty of precision
+        X = X.astype(np.float32)
+        
+        # Time-ordered holdout: last 20% of rows
+        cut = int(len(X) * 0.8)
+        X_train, X_test = X.iloc[:cut], X.iloc[cut:]
+        y_train, y_test = y.iloc[:cut], y.iloc[cut:]
         
         # Train model
         self.model.fit(X_train, y_train)
@@ -54,7 +61,7 @@ class SimpleAQIModel:
     
     def predict(self, X):
         """Make predictions"""
-        return self.model.predict(X)
+        return self.model.predict(X.astype(np.float32))
     
     def save(self, filename="models/aqi_model.joblib"):
         """Save the model"""
@@ -93,15 +100,16 @@ def create_sample_data():
     
     return data
 
-if __name__ == "__main__":
+def main():
+    """Train and save a model on sample data"""
     print("🧪 Testing model training...")
     
     # Create sample data
     data = create_sample_data()
     
     # Prepare features and target
-    X = data[['daily_avg_aqi', 'pm2_5_mean', 'pm10_mean', 'day_of_week', 'prev_day_aqi']]
-    y = data['next_day_aqi']
+    X = data[FEATURE_COLUMNS]
+    y = data[TARGET_COLUMN]
     
     # Train model
     model = SimpleAQIModel()
@@ -111,3 +119,6 @@ if __name__ == "__main__":
     model.save()
     
     print("✅ Model training test complete!")
+
+if __name__ == "__main__":
+    main()